@@ -1,4 +1,4 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, abort, current_app, g, request, jsonify
 from flask_cors import CORS
 import random
 import math
@@ -12,11 +12,15 @@ from qiskit.primitives import StatevectorEstimator
 from qiskit.quantum_info import SparsePauliOp
 from scipy.optimize import minimize
 
+import columnar
 import llm_service
+import metrics
+import static_assets
+from result_store import ResultStore
 
 logging.basicConfig(level=logging.INFO)
 
-app = Flask(__name__, static_folder='.', static_url_path='')
+app = Flask(__name__, static_folder=None)
 CORS(app)
 
 class QuantumVQEOptimizer:
@@ -81,14 +85,21 @@ class QuantumVQEOptimizer:
         return SparsePauliOp.from_list(pauli_list)
     
     def compute_energy(self, params, hamiltonian):
+        start = time.perf_counter()
         circuit = self.create_ansatz(params)
         job = self.estimator.run([(circuit, hamiltonian)])
         result = job.result()
         energy = float(result[0].data.evs)
         self.energy_history.append(energy)
+        metrics.vqe_evaluations_total.inc()
+        metrics.vqe_evaluation_duration_seconds.observe(time.perf_counter() - start)
         return energy
     
     def optimize(self, fiber_ratio, binding_energy, max_iter=50):
+        with metrics.vqe_optimization_duration_seconds.time():
+            return self._optimize(fiber_ratio, binding_energy, max_iter)
+
+    def _optimize(self, fiber_ratio, binding_energy, max_iter):
         self.energy_history = []
         
         num_params = self.num_qubits * 5
@@ -124,17 +135,97 @@ class QuantumVQEOptimizer:
 
 quantum_optimizer = QuantumVQEOptimizer(num_qubits=4)
 
+def _route_label():
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+@app.before_request
+def _start_request_metrics():
+    g.metrics_start = time.perf_counter()
+    g.metrics_route = _route_label()
+    metrics.http_requests_in_flight.inc(route=g.metrics_route)
+
+@app.after_request
+def _record_request_metrics(response):
+    start = g.get('metrics_start')
+    if start is not None:
+        route = g.metrics_route
+        metrics.http_requests_total.inc(route=route, method=request.method, status=response.status_code)
+        metrics.http_request_duration_seconds.observe(time.perf_counter() - start, route=route, method=request.method)
+    return response
+
+@app.teardown_request
+def _finish_request_metrics(exc):
+    route = g.pop('metrics_route', None)
+    if route is not None:
+        metrics.http_requests_in_flight.dec(route=route)
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    return Response(metrics.generate_latest(), content_type=metrics.CONTENT_TYPE)
+
+result_store = ResultStore(os.getenv(
+    'NANOBRICK_RESULTS_DB',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results.db')
+))
+
+def _record_result(endpoint, inputs, payload):
+    result_store.record(endpoint, inputs, payload)
+
+def _respond(payload, columns, metadata=None):
+    fmt = columnar.negotiate(request)
+    if fmt == 'json':
+        response = jsonify(payload)
+    else:
+        response = columnar.response(columns(), payload if metadata is None else metadata, fmt)
+    # The body depends on Accept, so caches must not serve one format for another.
+    response.vary.add('Accept')
+    return response
+
+def _result_columns(records):
+    columns = {
+        'id': np.array([r['id'] for r in records], dtype=np.int64),
+        'endpoint': np.array([r['endpoint'] for r in records], dtype=np.str_),
+        'created_at': np.array([r['created_at'] for r in records], dtype=np.float64),
+    }
+    columns.update(columnar.flatten_records([r['inputs'] for r in records], prefix='inputs'))
+    columns.update(columnar.flatten_records([r['result'] for r in records], prefix='result'))
+    return columns
+
+@app.errorhandler(columnar.UnsupportedFormat)
+def _unsupported_format(e):
+    return jsonify({
+        'success': False,
+        'error': str(e),
+        'message': 'Unsupported response format'
+    }), 406
+
+static_pipeline = static_assets.StaticPipeline(os.path.dirname(os.path.abspath(__file__)))
+
+def _serve_asset(response):
+    if response is None:
+        abort(404)
+    return response
+
+@app.before_request
+def _refresh_static_in_debug():
+    if current_app.debug:
+        static_pipeline.reload_if_stale()
+
 @app.route('/')
 def serve_index():
-    return send_from_directory('.', 'index.html')
+    return _serve_asset(static_pipeline.serve('index.html'))
 
 @app.route('/lab')
 def serve_lab():
-    return send_from_directory('.', 'lab.html')
+    return _serve_asset(static_pipeline.serve('lab.html'))
+
+@app.route('/assets/<name>')
+def serve_hashed_asset(name):
+    return _serve_asset(static_pipeline.serve_hashed(name))
 
 @app.route('/<path:path>')
 def serve_static(path):
-    return send_from_directory('.', path)
+    return _serve_asset(static_pipeline.serve(path))
 
 @app.route('/api/status', methods=['GET'])
 def get_status():
@@ -152,11 +243,64 @@ def get_status():
         'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
     })
 
+_RESULT_QUERY_PARAMS = {'endpoint', 'since', 'until', 'cursor', 'limit', 'format'}
+
+def _parse_time(value):
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return time.mktime(time.strptime(value, '%Y-%m-%dT%H:%M:%S' if 'T' in value else '%Y-%m-%d'))
+
+@app.route('/api/results', methods=['GET'])
+def get_results():
+    args = request.args
+    # Reject an unsupported ?format= before running the query.
+    columnar.negotiate(request)
+    ranges, equals = {}, {}
+    try:
+        for key, value in args.items():
+            if key in _RESULT_QUERY_PARAMS:
+                continue
+            prefix, _, name = key.partition('_')
+            if not name or prefix not in ('min', 'max', 'eq'):
+                raise ValueError(
+                    f"unknown query parameter '{key}'; filter inputs with eq_<name>, min_<name> or max_<name>"
+                )
+            if prefix == 'eq':
+                equals[name] = value
+            else:
+                low, high = ranges.get(name, (None, None))
+                ranges[name] = (float(value), high) if prefix == 'min' else (low, float(value))
+        page = result_store.query(
+            endpoint=args.get('endpoint'),
+            since=_parse_time(args.get('since')),
+            until=_parse_time(args.get('until')),
+            ranges=ranges,
+            equals=equals,
+            cursor=args.get('cursor'),
+            limit=int(args.get('limit', 50))
+        )
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': 'Invalid query parameter'
+        }), 400
+
+    return _respond(
+        {'success': True, **page},
+        lambda: _result_columns(page['results']),
+        metadata={'success': True, 'next_cursor': page['next_cursor']}
+    )
+
 @app.route('/api/classify', methods=['POST'])
 def classify_waste():
     data = request.get_json() or {}
     waste_type = data.get('wasteType', 'banana')
     condition = data.get('condition', 'moderate')
+    inputs = {'wasteType': waste_type, 'condition': condition}
 
     start_time = time.time()
 
@@ -172,7 +316,7 @@ def classify_waste():
                 elif v is not None:
                     props[k] = v
 
-            return jsonify({
+            payload = {
                 'success': True,
                 'ai_powered': True,
                 'model': 'Google Gemini',
@@ -191,9 +335,14 @@ def classify_waste():
                 'ai_analysis': llm_data.get('ai_analysis', ''),
                 'confidence': llm_data.get('confidence', 90),
                 'processing_time_ms': processing_time
-            })
+            }
+            _record_result('classify', inputs, payload)
+            return jsonify(payload)
         except Exception as exc:
             logging.warning('LLM classify failed, using fallback: %s', exc)
+            metrics.llm_fallbacks_total.inc(endpoint='classify', reason='error')
+    else:
+        metrics.llm_fallbacks_total.inc(endpoint='classify', reason='unavailable')
 
     time.sleep(0.5)
 
@@ -234,7 +383,7 @@ def classify_waste():
     base_confidence = 92 + random.uniform(-3, 5)
     confidence = min(98, base_confidence)
 
-    return jsonify({
+    payload = {
         'success': True,
         'ai_powered': False,
         'model': 'rule-based fallback',
@@ -252,7 +401,9 @@ def classify_waste():
         'ai_analysis': '',
         'confidence': round(confidence, 1),
         'processing_time_ms': random.randint(150, 350)
-    })
+    }
+    _record_result('classify', inputs, payload)
+    return jsonify(payload)
 
 @app.route('/api/optimize', methods=['POST'])
 def quantum_optimize():
@@ -260,6 +411,9 @@ def quantum_optimize():
     fiber_ratio = data.get('fiberRatio', 40)
     binding_energy = data.get('bindingEnergy', 50)
     iterations = data.get('iterations', 50)
+    inputs = {'fiberRatio': fiber_ratio, 'bindingEnergy': binding_energy, 'iterations': iterations}
+    # Reject an unsupported ?format= before spending time on the VQE run.
+    columnar.negotiate(request)
     
     start_time = time.time()
     
@@ -293,7 +447,7 @@ def quantum_optimize():
             'crystallinity_index': round(80 + ground_state_factor * 15, 1)
         }
         
-        return jsonify({
+        payload = {
             'success': True,
             'real_quantum': True,
             'optimization': {
@@ -314,6 +468,11 @@ def quantum_optimize():
             'energy_history': energy_history,
             'algorithm': 'Real VQE with COBYLA optimizer (Qiskit)',
             'processing_time_ms': processing_time
+        }
+        _record_result('optimize', inputs, payload)
+        return _respond(payload, lambda: {
+            'iteration': np.arange(len(vqe_result['energy_history']), dtype=np.int32),
+            'energy': np.asarray(vqe_result['energy_history'], dtype=np.float64)
         })
         
     except Exception as e:
@@ -343,6 +502,14 @@ def calculate_materials():
         ash *= factor
         nanocellulose *= factor
 
+    inputs = {
+        'banana': round(banana_fiber, 1),
+        'date': round(date_paste, 1),
+        'starch': round(starch, 1),
+        'ash': round(ash, 1),
+        'nano': round(nanocellulose, 1)
+    }
+
     start_time = time.time()
 
     if llm_service.is_available():
@@ -356,7 +523,7 @@ def calculate_materials():
             )
             processing_time = int((time.time() - start_time) * 1000)
 
-            return jsonify({
+            payload = {
                 'success': True,
                 'ai_powered': True,
                 'model': 'Google Gemini',
@@ -378,9 +545,14 @@ def calculate_materials():
                     )
                 },
                 'processing_time_ms': processing_time
-            })
+            }
+            _record_result('calculate', inputs, payload)
+            return jsonify(payload)
         except Exception as exc:
             logging.warning('LLM calculate failed, using fallback: %s', exc)
+            metrics.llm_fallbacks_total.inc(endpoint='calculate', reason='error')
+    else:
+        metrics.llm_fallbacks_total.inc(endpoint='calculate', reason='unavailable')
 
     base_strength = 15
     strength = base_strength + (banana_fiber * 0.3) + (nanocellulose * 2.5) + (starch * 0.1)
@@ -418,7 +590,7 @@ def calculate_materials():
     else:
         grade = 'C'
     
-    return jsonify({
+    payload = {
         'success': True,
         'ai_powered': False,
         'model': 'rule-based fallback',
@@ -470,7 +642,9 @@ def calculate_materials():
             'standard': '240 × 115 × 75 mm',
             'weight_per_unit': round(density * 0.00207, 2)
         }
-    })
+    }
+    _record_result('calculate', inputs, payload)
+    return jsonify(payload)
 
 @app.route('/api/extract', methods=['POST'])
 def extract_nanofiber():
@@ -478,6 +652,7 @@ def extract_nanofiber():
     source = data.get('source', 'banana')
     treatment = data.get('treatment', 'enzymatic')
     duration = data.get('duration', 60)
+    inputs = {'source': source, 'treatment': treatment, 'duration': duration}
     
     time.sleep(0.6)
     
@@ -493,7 +668,7 @@ def extract_nanofiber():
     crystallinity = 80 + random.uniform(-5, 10)
     aspect_ratio = 100 + random.uniform(0, 200)
     
-    return jsonify({
+    payload = {
         'success': True,
         'extraction': {
             'source': source,
@@ -512,7 +687,9 @@ def extract_nanofiber():
             'tensile_strength': round(150 + random.uniform(-20, 50), 0),
             'surface_area': round(300 + random.uniform(-50, 100), 0)
         }
-    })
+    }
+    _record_result('extract', inputs, payload)
+    return jsonify(payload)
 
 if __name__ == '__main__':
     print("""
@@ -526,10 +703,12 @@ if __name__ == '__main__':
     
        API Endpoints:
        - GET  /api/status     - System status
+       - GET  /metrics        - Prometheus metrics
        - POST /api/classify   - AI waste classification
        - POST /api/optimize   - Quantum optimization
        - POST /api/calculate  - Material calculator
        - POST /api/extract    - Nanofiber extraction
+       - GET  /api/results    - Stored experiment history
     
     ============================================================
     """)
@@ -0,0 +1,149 @@
+import json
+import zipfile
+
+import numpy as np
+from flask import Response
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+ARROW_MIMETYPE = "application/vnd.apache.arrow.stream"
+NPZ_MIMETYPE = "application/x-npz"
+JSON_MIMETYPE = "application/json"
+
+_FORMATS = {"arrow": ARROW_MIMETYPE, "npz": NPZ_MIMETYPE, "json": JSON_MIMETYPE}
+
+CHUNK_BYTES = 1 << 20
+ARROW_BATCH_ROWS = 65536
+
+
+class UnsupportedFormat(ValueError):
+    pass
+
+
+def available_formats() -> list:
+    return [f for f in _FORMATS if f != "arrow" or pa is not None]
+
+
+def negotiate(request) -> str:
+    # An explicit ``?format=`` wins over the Accept header, which notebooks
+    # rarely bother to set.
+    requested = request.args.get("format")
+    if requested:
+        requested = requested.lower()
+        if requested not in available_formats():
+            raise UnsupportedFormat(
+                f"format '{requested}' not available; choose one of {', '.join(available_formats())}"
+            )
+        return requested
+    # JSON is offered first so wildcard Accept headers keep getting JSON.
+    offered = [_FORMATS[f] for f in reversed(available_formats())]
+    best = request.accept_mimetypes.best_match(offered, default=JSON_MIMETYPE)
+    return next(f for f, m in _FORMATS.items() if m == best)
+
+
+def flatten_records(records: list, prefix: str = "") -> dict:
+    paths = {}
+    flat_rows = []
+    for record in records:
+        flat = {}
+        _flatten(record, prefix, flat)
+        flat_rows.append(flat)
+        for key in flat:
+            paths.setdefault(key, None)
+
+    columns = {}
+    for key in paths:
+        values = [row.get(key) for row in flat_rows]
+        present = [v for v in values if v is not None]
+        if all(isinstance(v, (int, float)) for v in present):
+            columns[key] = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+        else:
+            columns[key] = np.array(["" if v is None else str(v) for v in values], dtype=np.str_)
+    return columns
+
+
+def _flatten(value, prefix, out):
+    if isinstance(value, dict):
+        for k, v in value.items():
+            _flatten(v, f"{prefix}.{k}" if prefix else str(k), out)
+    elif isinstance(value, (int, float, str, bool)) and prefix:
+        out[prefix] = value
+    # Lists are left out: they do not fit a one-value-per-row column.
+
+
+def response(columns: dict, metadata: dict, fmt: str) -> Response:
+    columns = {name: np.ascontiguousarray(arr) for name, arr in columns.items()}
+    if fmt == "arrow":
+        body = _stream_arrow(columns, metadata)
+    else:
+        body = _stream_npz(columns, metadata)
+    return Response(body, mimetype=_FORMATS[fmt], direct_passthrough=True)
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+class _ChunkSink:
+    closed = False
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        chunks, self.chunks = self.chunks, []
+        return chunks
+
+
+def _stream_npz(columns, metadata):
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED) as zf:
+        with zf.open("__metadata__.json", "w") as fh:
+            fh.write(json.dumps(metadata, ensure_ascii=False, default=_json_default).encode("utf-8"))
+        yield from sink.drain()
+        for name, arr in columns.items():
+            with zf.open(f"{name}.npy", "w", force_zip64=True) as fh:
+                np.lib.format.write_array_header_1_0(fh, np.lib.format.header_data_from_array_1_0(arr))
+                # Slice the array's own buffer so each chunk is flushed to the
+                # client as soon as it is written, without materialising the
+                # whole column as bytes first.
+                raw = memoryview(arr.reshape(-1).view(np.uint8))
+                for start in range(0, len(raw), CHUNK_BYTES):
+                    fh.write(raw[start:start + CHUNK_BYTES])
+                    yield from sink.drain()
+        yield from sink.drain()
+    yield from sink.drain()
+
+
+def _stream_arrow(columns, metadata):
+    arrays = [pa.array(arr) for arr in columns.values()]
+    schema = pa.schema(
+        [pa.field(name, a.type) for name, a in zip(columns, arrays)],
+        metadata={"nanobrick.metadata": json.dumps(metadata, ensure_ascii=False, default=_json_default)}
+    )
+    num_rows = len(arrays[0]) if arrays else 0
+    sink = _ChunkSink()
+    with pa.ipc.new_stream(pa.PythonFile(sink, mode="w"), schema) as writer:
+        yield from sink.drain()
+        for start in range(0, num_rows, ARROW_BATCH_ROWS):
+            batch = pa.record_batch([a.slice(start, ARROW_BATCH_ROWS) for a in arrays], schema=schema)
+            writer.write_batch(batch)
+            yield from sink.drain()
+    yield from sink.drain()
@@ -1,10 +1,14 @@
 import os
 import json
+import time
 import logging
+from contextlib import contextmanager
 from google import genai
 from google.genai import types
 from dotenv import load_dotenv
 
+import metrics
+
 load_dotenv()
 
 logger = logging.getLogger(__name__)
@@ -62,6 +66,18 @@ def _parse_json_response(text: str) -> dict:
     return json.loads(cleaned)
 
 
+@contextmanager
+def _instrumented(operation: str):
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        metrics.llm_errors_total.inc(operation=operation)
+        raise
+    finally:
+        metrics.llm_request_duration_seconds.observe(time.perf_counter() - start, operation=operation)
+
+
 CLASSIFY_PROMPT = """\
 You are an expert agricultural waste analysis AI for "NanoBrick", a system that converts agricultural waste into bio-construction materials and nanocellulose fibers.
 
@@ -108,8 +124,9 @@ Important guidelines:
 
 def classify_waste(waste_type: str, condition: str) -> dict:
     prompt = CLASSIFY_PROMPT.format(waste_type=waste_type, condition=condition)
-    raw = _call_gemini(prompt, temperature=0.3)
-    data = _parse_json_response(raw)
+    with _instrumented("classify"):
+        raw = _call_gemini(prompt, temperature=0.3)
+        data = _parse_json_response(raw)
 
     data.setdefault("type", f"Agricultural Waste ({waste_type})")
     data.setdefault("category", "Organic Material")
@@ -197,8 +214,9 @@ def predict_materials(banana: float, date: float, starch: float,
     prompt = CALCULATE_PROMPT.format(
         banana=banana, date=date, starch=starch, ash=ash, nano=nano
     )
-    raw = _call_gemini(prompt, temperature=0.2)
-    data = _parse_json_response(raw)
+    with _instrumented("calculate"):
+        raw = _call_gemini(prompt, temperature=0.2)
+        data = _parse_json_response(raw)
 
     data.setdefault("properties", {})
     data.setdefault("sustainability", {
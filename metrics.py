@@ -0,0 +1,251 @@
+import os
+import time
+import bisect
+import weakref
+import itertools
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry = []
+_registry_lock = threading.Lock()
+_shard_ids = itertools.count()
+
+
+class _ThreadToken:
+    # Lives only in a metric's threading.local, so it is collected when its
+    # thread exits; a weakref.finalize on it retires the thread's shard.
+    __slots__ = ("__weakref__",)
+
+
+def _format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()) -> str:
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in pairs) + "}"
+
+
+class _Metric(ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        # Writers only ever touch their own thread's shard, so the hot path
+        # takes no lock. When a thread exits its shard is folded into
+        # ``_retired``, which keeps memory bounded under thread-per-request
+        # servers whether or not anything scrapes.
+        self._local = threading.local()
+        self._shards = {}
+        self._retired = {}
+        self._lock = threading.Lock()
+        with _registry_lock:
+            _registry.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def _shard(self) -> dict:
+        shard = getattr(self._local, "values", None)
+        if shard is None:
+            shard = {}
+            shard_id = next(_shard_ids)
+            token = _ThreadToken()
+            self._shards[shard_id] = shard
+            weakref.finalize(token, self._retire, shard_id).atexit = False
+            self._local.token = token
+            self._local.values = shard
+        return shard
+
+    def _retire(self, shard_id: int):
+        with self._lock:
+            shard = self._shards.pop(shard_id, None)
+            if shard is not None:
+                self._merge(self._retired, shard)
+
+    @abstractmethod
+    def _merge(self, target: dict, source: dict):
+        ...
+
+    def _snapshot(self) -> dict:
+        with self._lock:
+            merged = {}
+            self._merge(merged, self._retired)
+            for shard in list(self._shards.values()):
+                self._merge(merged, dict(shard))
+        return merged
+
+    @abstractmethod
+    def _samples(self):
+        ...
+
+    def expose(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, names, values, extra, value in self._samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(names, values, extra)} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        shard = self._shard()
+        key = self._key(labels)
+        shard[key] = shard.get(key, 0) + amount
+
+    def _merge(self, target, source):
+        for key, value in source.items():
+            target[key] = target.get(key, 0) + value
+
+    def _samples(self):
+        for key, value in sorted(self._snapshot().items()):
+            yield "", self.labelnames, key, (), value
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        shard = self._shard()
+        key = self._key(labels)
+        entry = shard.get(key)
+        if entry is None:
+            entry = shard[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        entry[0][bisect.bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+        entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _merge(self, target, source):
+        for key, (counts, total, count) in source.items():
+            entry = target.get(key)
+            if entry is None:
+                entry = target[key] = [[0] * len(counts), 0.0, 0]
+            for i, c in enumerate(list(counts)):
+                entry[0][i] += c
+            entry[1] += total
+            entry[2] += count
+
+    def _samples(self):
+        bounds = self.buckets + (float("inf"),)
+        for key, (counts, total, count) in sorted(self._snapshot().items()):
+            cumulative = 0
+            for bound, c in zip(bounds, counts):
+                cumulative += c
+                yield "_bucket", self.labelnames, key, (("le", _format_value(float(bound))),), cumulative
+            yield "_sum", self.labelnames, key, (), total
+            yield "_count", self.labelnames, key, (), count
+
+
+def _process_samples() -> str:
+    lines = []
+    rss = None
+    try:
+        with open("/proc/self/statm") as fh:
+            rss = int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    if rss is not None:
+        lines += [
+            "# HELP process_resident_memory_bytes Resident memory size in bytes.",
+            "# TYPE process_resident_memory_bytes gauge",
+            f"process_resident_memory_bytes {rss}",
+        ]
+    if resource is not None:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        # ru_maxrss is reported in kilobytes on Linux and bytes on macOS.
+        peak = usage.ru_maxrss if os.uname().sysname == "Darwin" else usage.ru_maxrss * 1024
+        lines += [
+            "# HELP process_max_resident_memory_bytes Peak resident memory size in bytes.",
+            "# TYPE process_max_resident_memory_bytes gauge",
+            f"process_max_resident_memory_bytes {peak}",
+            "# HELP process_cpu_seconds_total Total user and system CPU time in seconds.",
+            "# TYPE process_cpu_seconds_total counter",
+            f"process_cpu_seconds_total {_format_value(usage.ru_utime + usage.ru_stime)}",
+        ]
+    return "\n".join(lines)
+
+
+def generate_latest() -> str:
+    with _registry_lock:
+        metrics = list(_registry)
+    parts = [m.expose() for m in metrics]
+    parts.append(_process_samples())
+    return "\n".join(p for p in parts if p) + "\n"
+
+
+http_requests_total = Counter(
+    "nanobrick_http_requests_total", "HTTP requests handled, by route, method and status.",
+    ("route", "method", "status"))
+http_request_duration_seconds = Histogram(
+    "nanobrick_http_request_duration_seconds", "HTTP request latency in seconds, by route and method.",
+    ("route", "method"))
+http_requests_in_flight = Gauge(
+    "nanobrick_http_requests_in_flight", "HTTP requests currently being handled, by route.",
+    ("route",))
+
+llm_request_duration_seconds = Histogram(
+    "nanobrick_llm_request_duration_seconds", "Gemini call latency in seconds, by operation.",
+    ("operation",))
+llm_errors_total = Counter(
+    "nanobrick_llm_errors_total", "Gemini calls that raised or returned unparseable output, by operation.",
+    ("operation",))
+llm_fallbacks_total = Counter(
+    "nanobrick_llm_fallbacks_total", "Requests served by the rule-based fallback, by endpoint and reason.",
+    ("endpoint", "reason"))
+
+vqe_evaluations_total = Counter(
+    "nanobrick_vqe_evaluations_total", "Energy evaluations performed by the VQE optimizer.")
+vqe_evaluation_duration_seconds = Histogram(
+    "nanobrick_vqe_evaluation_duration_seconds", "Latency of a single VQE energy evaluation in seconds.",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0))
+vqe_optimization_duration_seconds = Histogram(
+    "nanobrick_vqe_optimization_duration_seconds", "Wall time of a full VQE optimization run in seconds.")
+
+result_store_written_total = Counter(
+    "nanobrick_result_store_written_total", "Experiment results persisted by the background writer.")
+result_store_dropped_total = Counter(
+    "nanobrick_result_store_dropped_total", "Experiment results dropped because the write queue was full or they could not be serialized.")
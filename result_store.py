@@ -0,0 +1,230 @@
+import json
+import math
+import time
+import queue
+import atexit
+import sqlite3
+import logging
+import threading
+from contextlib import closing
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    endpoint TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    inputs TEXT NOT NULL,
+    result TEXT NOT NULL
+);
+-- Pages are ordered by (created_at, id); SQLite appends the rowid to every
+-- index, so these serve both the filter and the sort.
+CREATE INDEX IF NOT EXISTS idx_results_endpoint_time ON results (endpoint, created_at);
+CREATE INDEX IF NOT EXISTS idx_results_time ON results (created_at);
+CREATE TABLE IF NOT EXISTS result_inputs (
+    result_id INTEGER NOT NULL REFERENCES results (id),
+    name TEXT NOT NULL,
+    num REAL,
+    text TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_inputs_num ON result_inputs (name, num, result_id);
+CREATE INDEX IF NOT EXISTS idx_inputs_text ON result_inputs (name, text, result_id);
+"""
+
+MAX_PAGE_SIZE = 200
+
+
+def _as_number(value):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class ResultStore:
+
+    def __init__(self, path: str, batch_size: int = 100, flush_interval: float = 0.5,
+                 max_queue: int = 10000):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stopped = threading.Event()
+
+        conn = _connect(path)
+        conn.executescript(_SCHEMA)
+        conn.close()
+
+        self._writer = threading.Thread(target=self._run, name="result-store-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def record(self, endpoint: str, inputs: dict, result: dict):
+        # Only enqueues; serialization and the insert happen on the writer thread.
+        try:
+            self._queue.put_nowait((endpoint, time.time(), inputs, result))
+        except queue.Full:
+            metrics.result_store_dropped_total.inc()
+            logger.warning("Result store queue full, dropping %s result.", endpoint)
+
+    def close(self, timeout: float = 5.0):
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        if not self._writer.is_alive():
+            logger.error("Result store writer is not running; %d queued results were not persisted.",
+                         self._queue.qsize())
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            logger.error("Result store queue still full after %.1fs; abandoning pending results.", timeout)
+            return
+        self._writer.join(timeout)
+
+    def _run(self):
+        conn = _connect(self.path)
+        running = True
+        while running:
+            item = self._queue.get()
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while item is not None:
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            else:
+                running = False
+            if batch:
+                try:
+                    self._write(conn, batch)
+                except Exception as exc:
+                    logger.error("Failed to persist %d results: %s", len(batch), exc)
+        conn.close()
+
+    def _write(self, conn: sqlite3.Connection, batch: list):
+        # Serialize before opening the transaction so one bad payload only
+        # loses itself rather than rolling back the whole batch.
+        encoded = []
+        for endpoint, created_at, inputs, result in batch:
+            try:
+                encoded.append((endpoint, created_at, inputs,
+                                json.dumps(inputs, ensure_ascii=False),
+                                json.dumps(result, ensure_ascii=False)))
+            except (TypeError, ValueError) as exc:
+                metrics.result_store_dropped_total.inc()
+                logger.error("Dropping unserializable %s result: %s", endpoint, exc)
+        if not encoded:
+            return
+
+        with conn:
+            for endpoint, created_at, inputs, inputs_json, result_json in encoded:
+                cur = conn.execute(
+                    "INSERT INTO results (endpoint, created_at, inputs, result) VALUES (?, ?, ?, ?)",
+                    (endpoint, created_at, inputs_json, result_json)
+                )
+                rows = []
+                for name, value in inputs.items():
+                    if isinstance(value, bool):
+                        continue
+                    if isinstance(value, (int, float)):
+                        rows.append((cur.lastrowid, name, float(value), None))
+                    elif isinstance(value, str):
+                        # Clients sometimes send numbers as JSON strings; keep
+                        # the text but also index the number for range filters.
+                        rows.append((cur.lastrowid, name, _as_number(value), value))
+                conn.executemany(
+                    "INSERT INTO result_inputs (result_id, name, num, text) VALUES (?, ?, ?, ?)",
+                    rows
+                )
+        metrics.result_store_written_total.inc(len(encoded))
+
+    def query(self, endpoint: str = None, since: float = None, until: float = None,
+              ranges: dict = None, equals: dict = None, cursor: str = None,
+              limit: int = 50) -> dict:
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        clauses, params = [], []
+        if endpoint:
+            clauses.append("r.endpoint = ?")
+            params.append(endpoint)
+        if since is not None:
+            clauses.append("r.created_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("r.created_at < ?")
+            params.append(until)
+        if cursor is not None:
+            created_at, sep, last_id = cursor.partition(":")
+            if not sep:
+                raise ValueError(f"invalid cursor '{cursor}'")
+            clauses.append("(r.created_at, r.id) < (?, ?)")
+            params.extend([float(created_at), int(last_id)])
+        for name, (low, high) in (ranges or {}).items():
+            # The outer query already filters on endpoint, so the subqueries
+            # stay on the (name, value, result_id) indexes.
+            sub = "SELECT result_id FROM result_inputs WHERE name = ?"
+            sub_params = [name]
+            if low is not None:
+                sub += " AND num >= ?"
+                sub_params.append(low)
+            if high is not None:
+                sub += " AND num <= ?"
+                sub_params.append(high)
+            clauses.append(f"r.id IN ({sub})")
+            params.extend(sub_params)
+        for name, value in (equals or {}).items():
+            # A numeric-looking value may be a number or a text input such as
+            # wasteType='123', so it is matched against both columns. The
+            # UNION keeps each branch on its own index.
+            sub = "SELECT result_id FROM result_inputs WHERE name = ? AND text = ?"
+            sub_params = [name, value]
+            number = _as_number(value)
+            if number is not None:
+                sub += " UNION ALL SELECT result_id FROM result_inputs WHERE name = ? AND num = ?"
+                sub_params += [name, number]
+            clauses.append(f"r.id IN ({sub})")
+            params.extend(sub_params)
+
+        sql = "SELECT r.id, r.endpoint, r.created_at, r.inputs, r.result FROM results r"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY r.created_at DESC, r.id DESC LIMIT ?"
+        params.append(limit + 1)
+
+        # Requests run on short-lived threads, so a per-query connection is
+        # cheaper than pretending to reuse one. WAL mode is a property of the
+        # database file and needs no pragma here.
+        with closing(sqlite3.connect(self.path, timeout=30)) as conn:
+            rows = conn.execute(sql, params).fetchall()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return {
+            'results': [
+                {
+                    'id': row[0],
+                    'endpoint': row[1],
+                    'created_at': row[2],
+                    'timestamp': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(row[2])),
+                    'inputs': json.loads(row[3]),
+                    'result': json.loads(row[4])
+                }
+                for row in rows
+            ],
+            'next_cursor': f"{rows[-1][2]!r}:{rows[-1][0]}" if has_more else None
+        }
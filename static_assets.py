@@ -0,0 +1,152 @@
+import os
+import re
+import gzip
+import hashlib
+import logging
+import mimetypes
+import threading
+
+from flask import Response, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Only these files are ever served; everything else in the project root
+# (``.env``, ``app.py``, ...) stays private.
+PAGES = ("index.html", "lab.html")
+ASSETS = ("style.css", "script.js", "lab.css", "lab.js")
+
+ASSET_URL_PREFIX = "/assets/"
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+
+_MIN_COMPRESS_SIZE = 256
+
+
+class _Asset:
+
+    def __init__(self, name: str, body: bytes, mtime: float):
+        self.name = name
+        self.mtime = mtime
+        self.content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        if self.content_type.startswith("text/") or self.content_type.endswith("javascript"):
+            self.content_type += "; charset=utf-8"
+        digest = hashlib.sha256(body).hexdigest()[:16]
+        stem, ext = os.path.splitext(name)
+        self.hashed_name = f"{stem}.{digest}{ext}"
+        self.variants = {"identity": (body, f'"{digest}"')}
+        if len(body) >= _MIN_COMPRESS_SIZE:
+            self.variants["gzip"] = (gzip.compress(body, compresslevel=9, mtime=0), f'"{digest}-gz"')
+            if brotli is not None:
+                self.variants["br"] = (brotli.compress(body, quality=11), f'"{digest}-br"')
+
+
+def _accepted_encodings(header: str) -> dict:
+    accepted = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison (RFC 9110 13.1.2).
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+
+class StaticPipeline:
+
+    def __init__(self, root: str):
+        self.root = root
+        self._lock = threading.Lock()
+        self._assets = {}
+        self._by_hashed_name = {}
+        self.build()
+
+    def build(self):
+        assets = {}
+        for name in ASSETS:
+            assets[name] = self._load(name)
+        urls = {name: ASSET_URL_PREFIX + asset.hashed_name for name, asset in assets.items()}
+        ref_pattern = re.compile(r'((?:href|src)=")(' + "|".join(re.escape(n) for n in urls) + r')(")')
+        for name in PAGES:
+            path = os.path.join(self.root, name)
+            with open(path, "rb") as fh:
+                html = fh.read().decode("utf-8")
+            html = ref_pattern.sub(lambda m: m.group(1) + urls[m.group(2)] + m.group(3), html)
+            assets[name] = _Asset(name, html.encode("utf-8"), os.path.getmtime(path))
+        with self._lock:
+            self._assets = assets
+            self._by_hashed_name = {a.hashed_name: a for n, a in assets.items() if n in ASSETS}
+        logger.info("Static pipeline built %d files (brotli %s).",
+                    len(assets), "enabled" if brotli is not None else "unavailable")
+
+    def _load(self, name: str) -> _Asset:
+        path = os.path.join(self.root, name)
+        with open(path, "rb") as fh:
+            return _Asset(name, fh.read(), os.path.getmtime(path))
+
+    def reload_if_stale(self):
+        for asset in list(self._assets.values()):
+            try:
+                if os.path.getmtime(os.path.join(self.root, asset.name)) != asset.mtime:
+                    self.build()
+                    return
+            except OSError:
+                return
+
+    def serve(self, name: str):
+        asset = self._assets.get(name)
+        if asset is None:
+            return None
+        return self._respond(asset, REVALIDATE_CACHE)
+
+    def serve_hashed(self, hashed_name: str):
+        asset = self._by_hashed_name.get(hashed_name)
+        if asset is None:
+            return None
+        return self._respond(asset, IMMUTABLE_CACHE)
+
+    def _respond(self, asset: _Asset, cache_control: str) -> Response:
+        accepted = _accepted_encodings(request.headers.get("Accept-Encoding", ""))
+        coding = "identity"
+        for candidate in ("br", "gzip"):
+            if candidate in asset.variants and accepted.get(candidate, accepted.get("*", 0)) > 0:
+                coding = candidate
+                break
+        body, etag = asset.variants[coding]
+
+        headers = {
+            "ETag": etag,
+            "Cache-Control": cache_control,
+            "Vary": "Accept-Encoding",
+        }
+        if coding != "identity":
+            headers["Content-Encoding"] = coding
+
+        if_none_match = request.headers.get("If-None-Match")
+        if if_none_match and _etag_matches(if_none_match, etag):
+            return Response(status=304, headers=headers)
+        return Response(body, status=200, content_type=asset.content_type, headers=headers)